@@ -6,150 +6,405 @@ Perfect for quickly understanding blog posts, news articles, or research papers.
 
 Just paste your text and click summarize!
 """
+import logging
+import re
+import shutil
+import threading
+from pathlib import Path
+
 import streamlit as st
-from transformers import pipeline
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import torch
+from transformers import AutoTokenizer, T5ForConditionalGeneration, TextIteratorStreamer, pipeline
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = 't5-small'
+# Exported + quantized ONNX files live here so we only pay the export cost once
+ONNX_CACHE_DIR = Path(__file__).parent / '.onnx_cache' / f'{MODEL_NAME}-int8'
+
+# Sentence boundary: whitespace that follows . ! or ?
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+
+def _build_onnx_model():
+    """Export t5-small to ONNX, quantize the weights to INT8 and save it to disk.
+
+    Needs the optional `optimum[onnxruntime]` package. Returns the folder with the quantized model.
+    """
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    # The folder only ever appears through the rename at the end, so if it exists it's complete
+    if ONNX_CACHE_DIR.exists():
+        return ONNX_CACHE_DIR
+
+    export_dir = ONNX_CACHE_DIR.with_name(f'{MODEL_NAME}-fp32')
+    tmp_dir = ONNX_CACHE_DIR.with_name(f'{ONNX_CACHE_DIR.name}.tmp')
+    # Clean up leftovers from an interrupted run
+    shutil.rmtree(export_dir, ignore_errors=True)
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    ORTModelForSeq2SeqLM.from_pretrained(MODEL_NAME, export=True).save_pretrained(export_dir)
+
+    tmp_dir.mkdir(parents=True)
+    for path in export_dir.iterdir():
+        if path.suffix == '.onnx':
+            # Dynamic quantization: INT8 weights, activations quantized on the fly
+            quantize_dynamic(str(path), str(tmp_dir / path.name), weight_type=QuantType.QInt8)
+        elif path.is_file():
+            shutil.copy(path, tmp_dir / path.name)
 
+    # The FP32 export is several hundred MB and we don't need it anymore
+    shutil.rmtree(export_dir, ignore_errors=True)
+    tmp_dir.rename(ONNX_CACHE_DIR)
+    return ONNX_CACHE_DIR
 
-@st.cache_resource
+
+def _load_onnx_summarizer():
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    model_dir = _build_onnx_model()
+
+    # Let ONNX Runtime fuse operators. Thread count is left at ORT's default (physical cores).
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_dir, session_options=sess_options)
+    # The ONNX export doesn't include tokenizer files, so get them from the original model
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    return pipeline('summarization', model=model, tokenizer=tokenizer, batch_size=8)
+
+
+def get_device():
+    """0 means the first GPU, -1 means CPU (same convention as transformers' pipeline)."""
+    return 0 if torch.cuda.is_available() else -1
+
+
+def _load_torch_summarizer(device: int, dtype):
+    try:
+        # safetensors weights are memory-mapped straight from the HF cache on later starts,
+        # which is much quicker than unpickling a PyTorch checkpoint
+        model = T5ForConditionalGeneration.from_pretrained(
+            MODEL_NAME, use_safetensors=True, torch_dtype=dtype
+        )
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        return pipeline('summarization', model=model, tokenizer=tokenizer, device=device, batch_size=8)
+    except Exception:
+        # No safetensors checkpoint (or an older transformers) - plain load always works
+        logger.warning('Could not load the safetensors checkpoint, using the plain pipeline load',
+                       exc_info=True)
+        return pipeline('summarization', model=MODEL_NAME, device=device,
+                        torch_dtype=dtype, batch_size=8)
+
+
+@st.cache_resource(show_spinner=False)
 def get_summarizer():
     # Using t5-small because it's fast and gives good results for deployment
-    return pipeline('summarization', model='t5-small')
+    device = get_device()
+    if device == 0:
+        # On a GPU, half precision roughly doubles speed and halves memory
+        return _load_torch_summarizer(device, torch.float16)
+    try:
+        # Quantized ONNX version is about 2x faster on CPU
+        return _load_onnx_summarizer()
+    except ImportError:
+        # optimum/onnxruntime not installed - use the regular PyTorch model
+        logger.info('optimum[onnxruntime] not installed, using the PyTorch model')
+    except Exception:
+        logger.warning('Could not load the ONNX model, using the PyTorch model instead', exc_info=True)
+
+    summarizer = _load_torch_summarizer(device, torch.float32)
+    try:
+        # INT8 Linear layers make CPU inference ~1.5-2x faster. Works for classic t5-small
+        # (ReLU feed-forward); the gated-GELU T5 v1.1 models break with this.
+        summarizer.model = torch.quantization.quantize_dynamic(
+            summarizer.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    except Exception:
+        logger.warning('Could not quantize the PyTorch model, keeping FP32', exc_info=True)
+    return summarizer
+
+
+@st.cache_resource(show_spinner=False)
+def preload_summarizer():
+    """Start loading the model in the background while the user is still pasting text.
+
+    Cached as a resource so the thread is only started once per server process, not on every rerun.
+    get_summarizer is cached too, so the button click later just picks up the loaded model.
+    """
+    thread = threading.Thread(target=get_summarizer, daemon=True)
+    add_script_run_ctx(thread, get_script_run_ctx())
+    thread.start()
+    return thread
 
 
 @st.cache_data
 def get_model_info():
     return {
-        'model_name': 't5-small',
+        'model_name': MODEL_NAME,
         'description': 'Optimized for fast deployment',
         'size': '~240MB'
     }
 
 
+def count_tokens(tokenizer, texts):
+    """Number of model tokens in each text, using the summarizer's own (fast, Rust) tokenizer."""
+    encoded = tokenizer(texts, add_special_tokens=False)['input_ids']
+    return [len(ids) for ids in encoded]
+
+
+def calculate_good_length(token_count: int, target_words: int = 50):
+    # Figure out reasonable length limits based on the input size.
+    # max_length/min_length are in tokens, so measure the input in tokens too.
+    max_length = min(256, max(int(target_words * 1.3), int(token_count * 0.4)))
+    min_length = max(10, int(max_length * 0.2))
+    return max_length, min_length
+
+
 def split_into_sentences(text: str):
-    import re
     # Simple way to break text into sentences using punctuation
-    sentences = re.split(r'(?<=[.!?])\s+', text.strip())
-    sentences = [s.strip() for s in sentences if s.strip()]
-    return sentences
+    parts = _SENT_SPLIT.split(text.strip())
+    return [s for s in (p.strip() for p in parts) if s]
+
 
+def _pack_pieces(pieces, lengths, sep: str, max_chars: int):
+    """Greedily glue pieces together with `sep` until a chunk would go over max_chars.
 
+    Works on indices and only joins once per finished chunk, so long articles stay fast.
+    """
+    chunks = []
+    sep_len = len(sep)
+    start = 0
+    cum = 0
+    for i, length in enumerate(lengths):
+        if cum + length + sep_len > max_chars and i > start:
+            chunks.append(sep.join(pieces[start:i]))
+            start = i
+            cum = length
+        else:
+            cum += length + sep_len
+    if start < len(pieces):
+        chunks.append(sep.join(pieces[start:]))
+    return chunks
+
+
+def _paragraphs(text: str):
+    # Paragraphs are separated by blank lines
+    return [p for p in (p.strip() for p in text.split('\n\n')) if p]
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
 def chunk_text_intelligently(text: str, max_chars: int = 1200):
     """Break up long articles into smaller pieces while keeping paragraphs together.
     
     This helps the AI understand the structure better than just cutting randomly.
     """
     # Try to split by paragraphs first (double line breaks)
-    paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
+    paragraphs = _paragraphs(text)
+    para_lengths = [len(p) for p in paragraphs]
     
     chunks = []
-    current_chunk = []
-    current_length = 0
+    start = 0  # first paragraph of the chunk we're building
     
-    for para in paragraphs:
-        para_length = len(para)
-        
+    for i, para_length in enumerate(para_lengths):
         # If a single paragraph is too long, we'll split it by sentences instead
         if para_length > max_chars:
-            if current_chunk:
-                chunks.append('\n\n'.join(current_chunk))
-                current_chunk = []
-                current_length = 0
-            
-            # Break long paragraph into sentences
-            sentences = split_into_sentences(para)
-            sentence_chunk = []
-            sentence_length = 0
-            for sentence in sentences:
-                if sentence_length + len(sentence) + 1 > max_chars and sentence_chunk:
-                    chunks.append(' '.join(sentence_chunk))
-                    sentence_chunk = [sentence]
-                    sentence_length = len(sentence)
-                else:
-                    sentence_chunk.append(sentence)
-                    sentence_length += len(sentence) + 1
-            if sentence_chunk:
-                chunks.append(' '.join(sentence_chunk))
-        
-        # If adding this paragraph would make the chunk too big, save what we have
-        elif current_length + para_length + 2 > max_chars and current_chunk:
-            chunks.append('\n\n'.join(current_chunk))
-            current_chunk = [para]
-            current_length = para_length
-        else:
-            current_chunk.append(para)
-            current_length += para_length + 2  # +2 for the paragraph breaks
+            chunks.extend(_pack_pieces(paragraphs[start:i], para_lengths[start:i], '\n\n', max_chars))
+            sentences = split_into_sentences(paragraphs[i])
+            chunks.extend(_pack_pieces(sentences, [len(s) for s in sentences], ' ', max_chars))
+            start = i + 1
     
-    if current_chunk:
-        chunks.append('\n\n'.join(current_chunk))
+    # Whatever is left is a run of normal-sized paragraphs
+    chunks.extend(_pack_pieces(paragraphs[start:], para_lengths[start:], '\n\n', max_chars))
     
     return chunks
 
 
-def summarize_text_fast(text: str, summarizer, num_sentences: int = 3) -> str:
-    """Take a long article and turn it into exactly 3 clear sentences."""
-    if not text or not text.strip():
-        return ''
+def get_decoding_options(quality: bool = False):
+    """Generation settings for the summarizer.
 
-    def calculate_good_length(input_text: str, target_words: int = 50):
-        # Figure out reasonable length limits based on the input size
-        word_count = len(input_text.split())
-        max_length = min(256, max(int(target_words * 1.3), int(word_count * 0.4)))
-        min_length = max(10, int(max_length * 0.2))
-        return max_length, min_length
+    Greedy decoding is ~4x less decoder work than beam search and is plenty for a 3-sentence summary.
+    """
+    if quality:
+        return {'num_beams': 4, 'early_stopping': True, 'no_repeat_ngram_size': 3}
+    return {'num_beams': 1, 'early_stopping': False, 'no_repeat_ngram_size': 3}
+
+
+def stream_summary(summarizer, text: str, max_length: int, min_length: int, preview, **decoding) -> str:
+    """Summarize text while showing the output word by word in `preview` (an st.empty()).
+
+    The model runs in a background thread and we update the placeholder as tokens arrive.
+    Only works with greedy decoding (num_beams=1) - streaming doesn't support beam search.
+    """
+    tokenizer = summarizer.tokenizer
+    model = summarizer.model
+    # The pipeline normally adds T5's "summarize: " prefix for us
+    prefix = model.config.prefix or ''
+    inputs = tokenizer(prefix + text, return_tensors='pt', truncation=True).to(summarizer.device)
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+
+    errors = []
+
+    def generate():
+        try:
+            model.generate(**inputs, streamer=streamer, max_length=max_length,
+                           min_length=min_length, do_sample=False, **decoding)
+        except Exception as e:
+            errors.append(e)
+            streamer.end()  # Unblock the loop below
+
+    thread = threading.Thread(target=generate, daemon=True)
+    thread.start()
+
+    summary = ''
+    for new_text in streamer:
+        summary += new_text
+        preview.markdown(f"*{summary.strip()}▌*")
+    thread.join()
+    preview.empty()  # The final sentences get shown properly once we're done
+
+    if errors:
+        raise errors[0]
+    return summary.strip()
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def summarize_chunk(chunk: str, quality: bool = False, target_words: int = 60) -> str:
+    """Summarize a single piece of text.
+
+    Model errors are raised, not swallowed - Streamlit never caches exceptions, so the next
+    click retries instead of being stuck with a fallback.
+    """
+    summarizer = get_summarizer()
+    max_len, min_len = calculate_good_length(count_tokens(summarizer.tokenizer, [chunk])[0], target_words)
+    result = summarizer(chunk, max_length=max_len, min_length=min_len, 
+                        do_sample=False, truncation=True, **get_decoding_options(quality))
+    return result[0]['summary_text'].strip()
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def summarize_chunks(chunks, quality: bool = False):
+    """Summarize all chunks in one batched call - much faster than one at a time.
+
+    Like summarize_chunk, errors are raised so a failed batch is never cached.
+    """
+    summarizer = get_summarizer()
+    # max_length comes from the biggest chunk so nothing gets cut short, and min_length from
+    # the smallest so short chunks aren't pushed to pad out their summaries.
+    bounds = [calculate_good_length(n, target_words=60)
+              for n in count_tokens(summarizer.tokenizer, chunks)]
+    max_len = max(b[0] for b in bounds)
+    min_len = min(b[1] for b in bounds)
+    results = summarizer(chunks, max_length=max_len, min_length=min_len,
+                         do_sample=False, truncation=True, batch_size=min(len(chunks), 8),
+                         **get_decoding_options(quality))
+    return [r['summary_text'].strip() for r in results]
+
+
+def summarize_sections(text: str, quality: bool = False):
+    """First pass: chunk the article and summarize every chunk.
+
+    Returns the draft summary plus a small analytics dict describing what the pipeline did.
+    If analytics['single_pass'] is False the draft is the joined chunk summaries and still needs
+    combine_summaries(). The model calls are cached; the fallbacks here are not.
+    """
+    analytics = {'single_pass': True, 'chunks': []}
 
     # Break the article into manageable pieces
     chunks = chunk_text_intelligently(text, max_chars=1000)
+    analytics['chunks'] = chunks
     
     if len(chunks) == 1:
         # Short article - just summarize it directly
-        max_len, min_len = calculate_good_length(chunks[0], target_words=80)
         try:
-            result = summarizer(chunks[0], max_length=max_len, min_length=min_len, 
-                              do_sample=False, truncation=True)
-            summary = result[0]['summary_text'].strip()
+            summary = summarize_chunk(chunks[0], quality, target_words=80)
         except Exception:
             # If something goes wrong, just use the original text
             summary = chunks[0]
     else:
         # Long article - summarize each piece, then combine those summaries
-        chunk_summaries = []
-        
-        # First pass: get the main points from each section
-        for chunk in chunks:
-            max_len, min_len = calculate_good_length(chunk, target_words=60)
-            try:
-                result = summarizer(chunk, max_length=max_len, min_length=min_len, 
-                                  do_sample=False, truncation=True)
-                chunk_summaries.append(result[0]['summary_text'].strip())
-            except Exception:
-                # Fallback: just take the first couple sentences
-                sentences = split_into_sentences(chunk)
-                chunk_summaries.append(' '.join(sentences[:2]))
-        
-        # Second pass: combine all the chunk summaries into one final summary
-        combined = ' '.join(chunk_summaries)
-        max_len, min_len = calculate_good_length(combined, target_words=70)
         try:
-            final_result = summarizer(combined, max_length=max_len, min_length=min_len, 
-                                    do_sample=False, truncation=True)
-            summary = final_result[0]['summary_text'].strip()
+            # First pass: get the main points from each section
+            chunk_summaries = summarize_chunks(chunks, quality)
         except Exception:
-            summary = combined
+            # Batch failed - go back to summarizing one piece at a time
+            chunk_summaries = []
+            for chunk in chunks:
+                try:
+                    chunk_summaries.append(summarize_chunk(chunk, quality, target_words=60))
+                except Exception:
+                    # Fallback: just take the first couple sentences
+                    sentences = split_into_sentences(chunk)
+                    chunk_summaries.append(' '.join(sentences[:2]))
+        
+        summary = ' '.join(chunk_summaries)
+        # Long combined text still needs the second pass (combine_summaries). If it's already
+        # short, the 3-sentence trim is enough and we skip another model call.
+        if len(summary.split()) > 120 and len(chunks) > 2:
+            analytics['single_pass'] = False
+
+    return summary, analytics
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def combine_summaries_cached(combined: str, quality: bool = False) -> str:
+    """Non-streaming second pass. Errors are raised so failures are never cached."""
+    summarizer = get_summarizer()
+    max_len, min_len = calculate_good_length(count_tokens(summarizer.tokenizer, [combined])[0], target_words=70)
+    final_result = summarizer(combined, max_length=max_len, min_length=min_len, 
+                              do_sample=False, truncation=True, **get_decoding_options(quality))
+    return final_result[0]['summary_text'].strip()
+
+
+def combine_summaries(combined: str, quality: bool = False, preview=None) -> str:
+    """Second pass: condense the joined chunk summaries into one final summary.
+
+    In greedy mode with a `preview` the output is streamed on the first run and kept in
+    st.session_state (st.cache_data can't hold it - it would replay every streamed frame).
+    Beam search can't stream, so it goes through combine_summaries_cached.
+    """
+    decoding = get_decoding_options(quality)
+    try:
+        if preview is not None and decoding['num_beams'] == 1:
+            streamed = st.session_state.setdefault('streamed_summaries', {})
+            key = (combined, quality)
+            if key not in streamed:
+                # Greedy decoding can be streamed, so show the summary as it's written
+                summarizer = get_summarizer()
+                max_len, min_len = calculate_good_length(
+                    count_tokens(summarizer.tokenizer, [combined])[0], target_words=70
+                )
+                streamed[key] = stream_summary(summarizer, combined, max_len, min_len,
+                                               preview, **decoding)
+            return streamed[key]
+        return combine_summaries_cached(combined, quality)
+    except Exception:
+        return combined
+
+
+def summarize_text_fast(text: str, num_sentences: int = 3, quality: bool = False, preview=None):
+    """Take a long article and turn it into exactly 3 clear sentences.
+
+    Returns the sentences plus the analytics dict from summarize_sections.
+    Pass an st.empty() as `preview` to watch the final pass being written.
+    """
+    if not text or not text.strip():
+        return [], {'single_pass': True, 'chunks': []}
+
+    summary, analytics = summarize_sections(text, quality)
+    if not analytics['single_pass']:
+        summary = combine_summaries(summary, quality, preview)
 
     # Make sure we get exactly 3 sentences and format them properly
     sentences = split_into_sentences(summary)
     final_sentences = sentences[:num_sentences]
     
-    # Ensure each sentence starts with a capital letter
-    formatted_sentences = []
-    for sentence in final_sentences:
-        sentence = sentence.strip()
-        if sentence:
-            # Capitalize first letter
-            sentence = sentence[0].upper() + sentence[1:] if len(sentence) > 1 else sentence.upper()
-            formatted_sentences.append(sentence)
+    # Ensure each sentence starts with a capital letter (s[:1] is safe even for 1-char strings)
+    formatted_sentences = [s[:1].upper() + s[1:] for s in (x.strip() for x in final_sentences) if s]
     
-    return formatted_sentences
+    return formatted_sentences, analytics
 
 
 def main():
@@ -159,6 +414,8 @@ def main():
         layout='centered',
         initial_sidebar_state='collapsed'
     )
+
+    preload_summarizer()
     
     # Add custom CSS for green button
     st.markdown("""
@@ -201,9 +458,13 @@ def main():
         st.header("🔧 Technical Details")
         st.write(f"**Model**: {model_info['model_name']}")
         st.write(f"**Size**: {model_info['size']}")
+        st.write(f"**Device**: {'GPU (FP16)' if get_device() == 0 else 'CPU'}")
         st.write("**Speed**: 2-5 seconds")
         st.write("**Approach**: Hierarchical summarization")
 
+        st.header("⚙️ Settings")
+        mode = st.radio("Summary mode", ["Speed (greedy)", "Quality (4-beam)"])
+
     # Main interface
     text = st.text_area(
         'Article text', 
@@ -211,6 +472,9 @@ def main():
         placeholder='Paste your full blog post, news article, or research paper here...\n\nTip: The longer the article, the more impressive the AI summarization will be!'
     )
 
+    # Full-width spot where the final summary pass streams in while it's being written
+    preview = st.empty()
+
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
         if st.button('🚀 Summarize Article', use_container_width=True):
@@ -218,7 +482,9 @@ def main():
                 st.error('📝 Please paste some text to summarize!')
                 return
             
-            if len(text.split()) < 50:
+            # Count words once and reuse it for validation and the stats below
+            word_count = len(text.split())
+            if word_count < 50:
                 st.warning('⚠️ Article seems quite short. Try a longer article for better results!')
                 return
 
@@ -227,8 +493,9 @@ def main():
                 import time
                 start_time = time.time()
                 
-                summarizer = get_summarizer()
-                summary = summarize_text_fast(text, summarizer, num_sentences=3)
+                summary, analytics = summarize_text_fast(text, num_sentences=3,
+                                                         quality=mode.startswith('Quality'),
+                                                         preview=preview)
                 
                 processing_time = time.time() - start_time
 
@@ -248,9 +515,9 @@ def main():
             # Use fewer columns with more space
             col1, col2 = st.columns(2)
             
-            original_words = len(text.split())
-            summary_text = ' '.join(summary)  # Join sentences for word count
-            summary_words = len(summary_text.split())
+            original_words = word_count
+            # Count the same way as original_words so the compression ratio is fair
+            summary_words = sum(len(s.split()) for s in summary)
             compression_ratio = (summary_words / original_words) * 100
             
             with col1:
@@ -262,14 +529,18 @@ def main():
             
             # Additional insights - full width
             st.write("**💡 What the AI did:**")
-            chunks = chunk_text_intelligently(text)
+            # Same chunks the summarizer actually used, not a fresh split
+            chunks = analytics['chunks']
             if len(chunks) == 1:
                 st.write("• Analyzed article as single unit (short article)")
                 st.write("• Applied 2-pass summarization for depth")
             else:
                 st.write(f"• Broke article into {len(chunks)} logical sections")
                 st.write("• Summarized each section individually")
-                st.write("• Combined section summaries intelligently")
+                if analytics['single_pass']:
+                    st.write("• Section summaries were short enough to skip the combine pass")
+                else:
+                    st.write("• Combined section summaries intelligently")
                 st.write("• Final condensation to exactly 3 sentences")
         
         # Call to action - full width